@@ -1,29 +1,35 @@
 from RPi import GPIO
-from threading import Timer
+
+# Bound once so on() and off() skip the GPIO module attribute lookups
+output = GPIO.output
+HIGH = GPIO.HIGH
+LOW = GPIO.LOW
 
 class Channel:
-    def __init__(self, pin):
+    def __init__(self, pin, scheduler):
         self.pin = pin
+        self.scheduler = scheduler
         GPIO.setup(self.pin, GPIO.OUT)
     
     def on(self, duration = 0):
-        GPIO.output(self.pin, GPIO.HIGH)
+        output(self.pin, HIGH)
         if duration > 0:
-            t = Timer(duration, self.off)
-            t.start()
+            self.scheduler.schedule(duration, self.off)
     
     def off(self):
-        GPIO.output(self.pin, GPIO.LOW)
+        output(self.pin, LOW)
 
 
 """
 from time import sleep
+from scheduler import Scheduler
 GPIO.setmode(GPIO.BCM)
+scheduler = Scheduler()
 
 channelPins = [4,17,27,22,5,6,13,19,26,21]
 channels = []
 for x in range(10):
-    channels.append(Channel(channelPins[x]))
+    channels.append(Channel(channelPins[x], scheduler))
 
 for x in range(4):
     channels[2].on(0.33)
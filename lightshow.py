@@ -1,17 +1,17 @@
 from RPi import GPIO
 from time import sleep
 from threading import Timer
-from random import random
+from random import Random
 from subprocess import Popen
 
 from player import Player
 from channel import Channel
 from button import Button
-
-import requests
+from scheduler import Scheduler
 
 integrationCheck = ""
 integrationDone = ""
+integrationSession = None
 
 preludeStart = 0.3494857143
 preludeTempo = 0.7365142857
@@ -25,19 +25,22 @@ mainCurrentBeat = 0
 
 GPIO.setmode( GPIO.BCM )
 
+scheduler = Scheduler()
+
 channelPins = [17,27,22,13,19,26,21,20,16,12]
 channels = []
 for x in range(10):
-    channels.append( Channel( channelPins[x] ) )
-flashTimers = []
-for x in range(10):
-    flashTimers.append( Timer( 0.1, channels[x].off ) )
+    channels.append( Channel( channelPins[x], scheduler ) )
+flashTimers = [None] * 10
+flashRandom = Random()
+# Longest random on/off time (in seconds) for each flash speed
+flashScalers = { 1: 5.0, 2: 3.0, 3: 0.5 }
 
 started = False
 preludeFinished = False
 mainFinished = False
 finished = False
-player = False
+player = None
 lightMode = 1
 
 def syncCb( position ):
@@ -99,8 +102,7 @@ def preludeBeat():
         
     if( preludeCurrentBeat == 1 ):
         # Make sure all channels are off
-        for x in range( 10 ):
-            channels[x].off()
+        allOff()
         # First note is at the end of the first measure
         playNote( 5, preludeTempo * 0.5, preludeTempo * 0.5 )
     elif( ( preludeCurrentBeat % 2 ) == 0 ):
@@ -115,7 +117,7 @@ def preludeBeat():
     return True
 
 def mainBeat():
-    global mainFinished, mainBeat, player, mainStart, mainTempo, mainTotalBeats, mainCurrentBeat, channels, normalMode
+    global mainFinished, mainBeat, player, mainStart, mainTempo, mainTotalBeats, mainCurrentBeat, mainSchedule, channels, normalMode
     if mainFinished:
         return True
     mainCurrentBeat = mainCurrentBeat + 1
@@ -129,362 +131,135 @@ def mainBeat():
             mainFinished = True
         t = Timer( delay, mainBeat )
         t.start()
-    if( mainCurrentBeat in [45, 141, 142, 143, 144, 145, 146, 147, 148, 157, 158, 159, 160, 165] ):
-        # Pulse all channels
-        for x in range( 10 ):
-            channels[x].on( 0.25 )
-    if( mainCurrentBeat in [8, 16, 64, 68, 72, 76, 80, 84] ):
-        # Uneven "God rest ye merry gentlemen"
-        playPhrase( 3, mainTempo )
-    if( mainCurrentBeat in [9, 17, 73, 77, 81, 85, 97, 101, 105, 109] ):
-        # Carol of the bells, "ding, dong, ding, dong"
-        playPhrase( 4, mainTempo )
-    if( mainCurrentBeat in [25, 26, 27, 28, 29, 30, 31, 32, 61, 62, 63, 64, 73, 105, 106, 107, 108, 109, 110, 111, 112, 121, 122, 123, 124, 125, 126, 127, 128, 166, 167, 168, 169, 170, 171, 172, 173, 174, 175] ):
-        # Carol of the bells, repeating theme
-        playPhrase( 5, mainTempo )
-    if( mainCurrentBeat in [29, 30, 31, 32] ):
-        # Carol of the bells, repeating theme, dual notes
-        playPhrase( 6, mainTempo )
-    if( mainCurrentBeat in [33, 113, 129] ):
-        # Carol of the bells, "gaily they ring"
-        playPhrase( 7, mainTempo )
-    if( mainCurrentBeat in [34, 114, 130] ):
-        # Carol of the bells, "while people sing"
-        playPhrase( 8, mainTempo )
-    if( mainCurrentBeat in [35, 115, 131] ):
-        # Carol of the bells, "songs of good cheer"
-        playPhrase( 9, mainTempo )
-    if( mainCurrentBeat in [36, 116, 132] ):
-        # Carol of the bells, "Christmas is here"
-        playPhrase( 10, mainTempo )
-    if( mainCurrentBeat in [37, 39, 41, 42, 43, 44, 117, 119, 133, 135] ):
-        # Carol of the bells, "merry, merry, merry.."
-        playPhrase( 11, mainTempo )
-    if( mainCurrentBeat in [38, 40, 118, 120, 134, 136, 137, 138, 139, 140] ):
-        # Carol of the bells, "..merry Christmas"
-        playPhrase( 12, mainTempo )
-    if( mainCurrentBeat in [1, 2, 3, 4, 5, 6, 7, 8, 9, 13, 14, 15, 16, 21, 22, 23, 24, 89, 90, 91, 92, 93, 94, 95, 96] ):
-        # Pulsing base
-        playPhrase( 13, mainTempo )
-    if( mainCurrentBeat in [44, 48, 52, 56] ):
-        # Descent, part 1
-        playPhrase( 14, mainTempo )
-    if( mainCurrentBeat in [47, 51, 55, 59] ):
-        # Descent, part 2
-        playPhrase( 15, mainTempo )
-    if( mainCurrentBeat == 161 ):
-        # Fast random flashing
-        flashLights( 3 )
-    if( mainCurrentBeat == 165 ):
-        # Turn off random flashing
-        flashLights( -1 )
-    if( mainCurrentBeat in [149, 151, 153, 155] ):
-        stepDown( mainTempo )
-    if( mainCurrentBeat in [150, 152, 154, 156] ):
-        stepUp( mainTempo )
+    for action, args in mainSchedule.get( mainCurrentBeat, () ):
+        action( *args )
         
     return True
 
 def playNote( channel, delay, duration ):
-    global channels
-    t = Timer( delay, channels[channel].on, [duration] )
-    t.start()
+    global channels, scheduler
+    scheduler.schedule( delay, channels[channel].on, [duration] )
     return True
 
+def allOn( duration = 0 ):
+    # Switch every channel with a single GPIO call
+    global channelPins, scheduler
+    GPIO.output( channelPins, GPIO.HIGH )
+    if duration > 0:
+        scheduler.schedule( duration, allOff )
+    return True
+
+def allOff():
+    global channelPins
+    GPIO.output( channelPins, GPIO.LOW )
+    return True
+
+# Channel orders and delay fractions used by stepUp and stepDown
+stepUpOrder = ( 9, 8, 1, 6, 5, 3, 2, 4, 7, 0 )
+stepDownOrder = ( 0, 7, 4, 2, 3, 5, 6, 1, 8, 9 )
+stepFractions = tuple( 0.1 * float( x ) for x in range( 10 ) )
+
 def stepUp( tempo ):
+    global channels, scheduler, stepUpOrder, stepFractions
     # light up all lights in order
-    order = [9, 8, 1, 6, 5, 3, 2, 4, 7, 0]
-    for x in range( 10 ):
-        if( x == 0 ):
-            channels[order[x]].on( tempo )
-        else:
-            t = Timer( tempo * 0.1 * float( x ), channels[order[x]].on )
-            t.start()
+    channels[stepUpOrder[0]].on( tempo )
+    for x in range( 1, 10 ):
+        scheduler.schedule( tempo * stepFractions[x], channels[stepUpOrder[x]].on )
     return True
 
 def stepDown( tempo ):
+    global channels, stepDownOrder, stepFractions
     # turn off all lights in reverse order
-    order = [0, 7, 4, 2, 3, 5, 6, 1, 8, 9]
-    for x in range( 10 ):
-        if( x == 9 ):
-            channels[order[9]].on()
-        else:
-            channels[order[x]].on( tempo * 0.1 * (float( x ) + 1) )
+    for x in range( 9 ):
+        channels[stepDownOrder[x]].on( tempo * stepFractions[x + 1] )
+    channels[stepDownOrder[9]].on()
     return True
 
+# Each phrase is ( flashAll, notes ): flashAll is the length in seconds of an
+# opening flash of every channel (0 for none), and each note is
+# ( delay, channel, duration ) with delay and duration in beats of the tempo
+phrases = [
+    # Four notes that repeat at the beginning of the song
+    ( 0, [ ( 0, 6, 0.5 ), ( 0.5, 1, 0.5 ), ( 1, 6, 0.5 ), ( 1.5, 5, 0.5 ) ] ),
+    # "Got rest ye merry gentlemen"
+    ( 0, [ ( 0.5, 3, 0.33 ), ( 1, 2, 0.33 ), ( 1.5, 0, 0.33 ), ( 2, 0, 0.33 ), ( 2.5, 2, 0.33 ), ( 3, 3, 0.33 ), ( 3.5, 7, 0.33 ), ( 4, 4, 0.33 ) ] ),
+    # "Let nothing you dismay"
+    ( 0, [ ( 0.5, 4, 0.33 ), ( 1, 7, 0.33 ), ( 1.5, 3, 0.33 ), ( 2, 2, 0.33 ), ( 2.5, 0, 0.33 ), ( 3, 9, 2 ) ] ),
+    # Uneven "God rest ye merry gentlemen"
+    ( 0, [ ( 0.66, 3, 0.25 ), ( 1, 2, 0.25 ), ( 1.66, 0, 0.25 ), ( 2, 0, 0.25 ), ( 2.66, 2, 0.25 ), ( 3, 3, 0.25 ), ( 3.66, 7, 0.25 ), ( 4, 4, 0.25 ) ] ),
+    # Carol of the bells, "ding, dong, ding, dong"
+    ( 0, [ ( 0, 8, 1 ), ( 1, 1, 1 ), ( 2, 6, 1 ), ( 3, 5, 2 ) ] ),
+    # Carol of the bells, repeating theme
+    ( 0, [ ( 0, 0, 0.166 ), ( 0.33, 2, 0.2 ), ( 0.5, 0, 0.2 ), ( 0.66, 3, 0.2 ) ] ),
+    # Carol of the bells, repeating theme, dual notes
+    ( 0, [ ( 0, 1, 0.166 ), ( 0.33, 6, 0.2 ), ( 0.5, 1, 0.2 ), ( 0.66, 5, 0.2 ) ] ),
+    # Carol of the bells, "gaily they ring"
+    ( 0, [ ( 0, 8, 0.166 ), ( 0.33, 8, 0.1 ), ( 0.5, 8, 0.166 ), ( 0.66, 1, 0.166 ), ( 0.83, 6, 0.166 ) ] ),
+    # Carol of the bells, "while people sing"
+    ( 0, [ ( 0, 5, 0.166 ), ( 0, 0, 0.166 ), ( 0.33, 5, 0.1 ), ( 0.33, 0, 0.1 ), ( 0.5, 5, 0.166 ), ( 0.5, 0, 0.166 ), ( 0.66, 3, 0.166 ), ( 0.66, 2, 0.166 ), ( 0.83, 4, 0.166 ), ( 0.83, 7, 0.166 ) ] ),
+    # Carol of the bells, "songs of good cheer"
+    ( 0, [ ( 0, 3, 0.166 ), ( 0, 2, 0.166 ), ( 0.33, 3, 0.1 ), ( 0.33, 2, 0.1 ), ( 0.5, 3, 0.166 ), ( 0.5, 2, 0.166 ), ( 0.66, 5, 0.166 ), ( 0.66, 0, 0.166 ), ( 0.83, 3, 0.166 ), ( 0.83, 2, 0.166 ) ] ),
+    # Carol of the bells, "Christmas is here"
+    ( 0, [ ( 0, 4, 0.166 ), ( 0, 7, 0.166 ), ( 0.33, 4, 0.1 ), ( 0.33, 7, 0.1 ), ( 0.5, 4, 0.1 ), ( 0.5, 7, 0.1 ), ( 0.66, 4, 0.166 ), ( 0.66, 7, 0.166 ) ] ),
+    # Carol of the bells, "merry, merry, merry.."
+    ( 0, [ ( 0, 7, 0.166 ), ( 0.166, 4, 0.166 ), ( 0.33, 2, 0.166 ), ( 0.5, 3, 0.166 ), ( 0.66, 0, 0.166 ), ( 0.833, 5, 0.166 ) ] ),
+    # Carol of the bells, "..merry Christmas"
+    ( 0, [ ( 0, 6, 0.166 ), ( 0.166, 1, 0.166 ), ( 0.33, 6, 0.33 ), ( 0.66, 5, 0.33 ) ] ),
+    # Pulsing base, opening with a flash of every channel
+    ( 0.166, [ ( 0.33, 8, 0.1 ), ( 0.33, 9, 0.1 ), ( 0.5, 8, 0.1 ), ( 0.5, 9, 0.1 ), ( 0.66, 8, 0.1 ), ( 0.66, 9, 0.1 ), ( 0.833, 8, 0.1 ), ( 0.833, 9, 0.1 ) ] ),
+    # Descent, part 1
+    ( 0, [ ( 0.66, 9, 0.166 ), ( 1, 9, 0.33 ), ( 1.33, 8, 0.33 ), ( 1.66, 1, 0.33 ), ( 2, 1, 0.33 ), ( 2.33, 6, 0.33 ), ( 2.66, 5, 0.33 ) ] ),
+    # Descent, part 2
+    ( 0, [ ( 0, 6, 0.33 ), ( 0.33, 5, 0.33 ), ( 1, 2, 0.33 ), ( 1, 3, 0.33 ), ( 1.33, 2, 0.33 ), ( 1.33, 3, 0.33 ), ( 1.66, 4, 0.33 ), ( 1.66, 7, 0.33 ), ( 2, 0, 0.166 ), ( 2.33, 0, 0.1 ) ] )
+]
+
+# Phrase timings already scaled to a tempo, keyed by ( phrase, tempo )
+scaledPhrases = {}
+
+def scalePhrase( phrase, tempo ):
+    # Phrases only play at the prelude and main tempos, so scale each once
+    global phrases, scaledPhrases
+    key = ( phrase, tempo )
+    if key not in scaledPhrases:
+        flashAll, notes = phrases[phrase]
+        scaledPhrases[key] = ( flashAll, tuple( ( tempo * delay, channel, tempo * duration ) for delay, channel, duration in notes ) )
+    return scaledPhrases[key]
+
 def playPhrase( phrase, tempo ):
-    global channels
-    if( phrase == 0 ):
-        # Four notes that repeat at the beginning of the song
-        channels[6].on( tempo * 0.5 )
-        t1 = Timer( tempo * 0.5, channels[1].on, [tempo * 0.5] )
-        t2 = Timer( tempo, channels[6].on, [tempo * 0.5] )
-        t3 = Timer( tempo * 1.5, channels[5].on, [tempo * 0.5] )
-        t1.start()
-        t2.start()
-        t3.start()
-    elif( phrase == 1 ):
-        # "Got rest ye merry gentlemen"
-        t1 = Timer( tempo * 0.5, channels[3].on, [tempo * 0.33] )
-        t2 = Timer( tempo, channels[2].on, [tempo * 0.33] )
-        t3 = Timer( tempo * 1.5, channels[0].on, [tempo * 0.33] )
-        t4 = Timer( tempo * 2, channels[0].on, [tempo * 0.33] )
-        t5 = Timer( tempo * 2.5, channels[2].on, [tempo * 0.33] )
-        t6 = Timer( tempo * 3, channels[3].on, [tempo * 0.33] )
-        t7 = Timer( tempo * 3.5, channels[7].on, [tempo * 0.33] )
-        t8 = Timer( tempo * 4, channels[4].on, [tempo * 0.33] )
-        t1.start()
-        t2.start()
-        t3.start()
-        t4.start()
-        t5.start()
-        t6.start()
-        t7.start()
-        t8.start()
-    elif( phrase == 2 ):
-        # "Let nothing you dismay"
-        t1 = Timer( tempo * 0.5, channels[4].on, [tempo * 0.33] )
-        t2 = Timer( tempo, channels[7].on, [tempo * 0.33] )
-        t3 = Timer( tempo * 1.5, channels[3].on, [tempo * 0.33] )
-        t4 = Timer( tempo * 2, channels[2].on, [tempo * 0.33] )
-        t5 = Timer( tempo * 2.5, channels[0].on, [tempo * 0.33] )
-        t6 = Timer( tempo * 3, channels[9].on, [tempo * 2] )
-        t1.start()
-        t2.start()
-        t3.start()
-        t4.start()
-        t5.start()
-        t6.start()
-    elif( phrase == 3 ):
-        # Uneven "God rest ye merry gentlemen"
-        t1 = Timer( tempo * 0.66, channels[3].on, [tempo * 0.25] )
-        t2 = Timer( tempo, channels[2].on, [tempo * 0.25] )
-        t3 = Timer( tempo * 1.66, channels[0].on, [tempo * 0.25] )
-        t4 = Timer( tempo * 2, channels[0].on, [tempo * 0.25] )
-        t5 = Timer( tempo * 2.66, channels[2].on, [tempo * 0.25] )
-        t6 = Timer( tempo * 3, channels[3].on, [tempo * 0.25] )
-        t7 = Timer( tempo * 3.66, channels[7].on, [tempo * 0.25] )
-        t8 = Timer( tempo * 4, channels[4].on, [tempo * 0.25] )
-        t1.start()
-        t2.start()
-        t3.start()
-        t4.start()
-        t5.start()
-        t6.start()
-        t7.start()
-        t8.start()
-    elif( phrase == 4 ):
-        # Carol of the bells, "ding, dong, ding, dong"
-        channels[8].on( tempo )
-        t1 = Timer( tempo, channels[1].on, [tempo] )
-        t2 = Timer( tempo * 2, channels[6].on, [tempo] )
-        t3 = Timer( tempo * 3, channels[5].on, [tempo * 2] )
-        t1.start()
-        t2.start()
-        t3.start()
-    elif( phrase == 5 ):
-        # Carol of the bells, repeating theme
-        channels[0].on( tempo * 0.166 )
-        t1 = Timer( tempo * 0.33, channels[2].on, [tempo * 0.2] )
-        t2 = Timer( tempo * 0.5, channels[0].on, [tempo * 0.2] )
-        t3 = Timer( tempo * 0.66, channels[3].on, [tempo * 0.2] )
-        t1.start()
-        t2.start()
-        t3.start()
-    elif( phrase == 6 ):
-        # Carol of the bells, repeating theme, dual notes
-        channels[1].on( tempo * 0.166 )
-        t1 = Timer( tempo * 0.33, channels[6].on, [tempo * 0.2] )
-        t2 = Timer( tempo * 0.5, channels[1].on, [tempo * 0.2] )
-        t3 = Timer( tempo * 0.66, channels[5].on, [tempo * 0.2] )
-        t1.start()
-        t2.start()
-        t3.start()
-    elif( phrase == 7 ):
-        # Carol of the bells, "gaily they ring"
-        channels[8].on( tempo * 0.166 )
-        t1 = Timer( tempo * 0.33, channels[8].on, [tempo * 0.1] )
-        t2 = Timer( tempo * 0.5, channels[8].on, [tempo * 0.166] )
-        t3 = Timer( tempo * 0.66, channels[1].on, [tempo * 0.166] )
-        t4 = Timer( tempo * 0.83, channels[6].on, [tempo * 0.166] )
-        t1.start()
-        t2.start()
-        t3.start()
-        t4.start()
-    elif( phrase == 8 ):
-        # Carol of the bells, "while people sing"
-        channels[5].on( tempo * 0.166 )
-        channels[0].on( tempo * 0.166 )
-        t1 = Timer( tempo * 0.33, channels[5].on, [tempo * 0.1] )
-        t2 = Timer( tempo * 0.33, channels[0].on, [tempo * 0.1] )
-        t3 = Timer( tempo * 0.5, channels[5].on, [tempo * 0.166] )
-        t4 = Timer( tempo * 0.5, channels[0].on, [tempo * 0.166] )
-        t5 = Timer( tempo * 0.66, channels[3].on, [tempo * 0.166] )
-        t6 = Timer( tempo * 0.66, channels[2].on, [tempo * 0.166] )
-        t7 = Timer( tempo * 0.83, channels[4].on, [tempo * 0.166] )
-        t8 = Timer( tempo * 0.83, channels[7].on, [tempo * 0.166] )
-        t1.start()
-        t2.start()
-        t3.start()
-        t4.start()
-        t5.start()
-        t6.start()
-        t7.start()
-        t8.start()
-    elif( phrase == 9 ):
-        # Carol of the bells, "songs of good cheer"
-        channels[3].on( tempo * 0.166 )
-        channels[2].on( tempo * 0.166 )
-        t1 = Timer( tempo * 0.33, channels[3].on, [tempo * 0.1] )
-        t2 = Timer( tempo * 0.33, channels[2].on, [tempo * 0.1] )
-        t3 = Timer( tempo * 0.5, channels[3].on, [tempo * 0.166] )
-        t4 = Timer( tempo * 0.5, channels[2].on, [tempo * 0.166] )
-        t5 = Timer( tempo * 0.66, channels[5].on, [tempo * 0.166] )
-        t6 = Timer( tempo * 0.66, channels[0].on, [tempo * 0.166] )
-        t7 = Timer( tempo * 0.83, channels[3].on, [tempo * 0.166] )
-        t8 = Timer( tempo * 0.83, channels[2].on, [tempo * 0.166] )
-        t1.start()
-        t2.start()
-        t3.start()
-        t4.start()
-        t5.start()
-        t6.start()
-        t7.start()
-        t8.start()
-    elif( phrase == 10 ):
-        # Carol of the bells, "Christmas is here"
-        channels[4].on( tempo * 0.166 )
-        channels[7].on( tempo * 0.166 )
-        t1 = Timer( tempo * 0.33, channels[4].on, [tempo * 0.1] )
-        t2 = Timer( tempo * 0.33, channels[7].on, [tempo * 0.1] )
-        t3 = Timer( tempo * 0.5, channels[4].on, [tempo * 0.1] )
-        t4 = Timer( tempo * 0.5, channels[7].on, [tempo * 0.1] )
-        t5 = Timer( tempo * 0.66, channels[4].on, [tempo * 0.166] )
-        t6 = Timer( tempo * 0.66, channels[7].on, [tempo * 0.166] )
-        t1.start()
-        t2.start()
-        t3.start()
-        t4.start()
-        t5.start()
-        t6.start()
-    elif( phrase == 11 ):
-        # Carol of the bells, "merry, merry, merry.."
-        channels[7].on( tempo * 0.166 )
-        t1 = Timer( tempo * 0.166, channels[4].on, [tempo * 0.166] )
-        t2 = Timer( tempo * 0.33, channels[2].on, [tempo * 0.166] )
-        t3 = Timer( tempo * 0.5, channels[3].on, [tempo * 0.166] )
-        t4 = Timer( tempo * 0.66, channels[0].on, [tempo * 0.166] )
-        t5 = Timer( tempo * 0.833, channels[5].on, [tempo * 0.166] )
-        t1.start()
-        t2.start()
-        t3.start()
-        t4.start()
-        t5.start()
-    elif( phrase == 12 ):
-        # Carol of the bells, "..merry Christmas"
-        channels[6].on( tempo * 0.166 )
-        t1 = Timer( tempo * 0.166, channels[1].on, [tempo * 0.166] )
-        t2 = Timer( tempo * 0.33, channels[6].on, [tempo * 0.33] )
-        t3 = Timer( tempo * 0.66, channels[5].on, [tempo * 0.33] )
-        t1.start()
-        t2.start()
-        t3.start()
-    elif( phrase == 13 ):
-        # Pulsing base
-        for x in range( 10 ):
-            channels[x].on( 0.166 )
-        t1 = Timer( tempo * 0.33, channels[8].on, [tempo * 0.1] )
-        t2 = Timer( tempo * 0.33, channels[9].on, [tempo * 0.1] )
-        t3 = Timer( tempo * 0.5, channels[8].on, [tempo * 0.1] )
-        t4 = Timer( tempo * 0.5, channels[9].on, [tempo * 0.1] )
-        t5 = Timer( tempo * 0.66, channels[8].on, [tempo * 0.1] )
-        t6 = Timer( tempo * 0.66, channels[9].on, [tempo * 0.1] )
-        t7 = Timer( tempo * 0.833, channels[8].on, [tempo * 0.1] )
-        t8 = Timer( tempo * 0.833, channels[9].on, [tempo * 0.1] )
-        t1.start()
-        t2.start()
-        t3.start()
-        t4.start()
-        t5.start()
-        t6.start()
-        t7.start()
-        t8.start()
-    elif( phrase == 14 ):
-        # Descent, part 1
-        t1 = Timer( tempo * 0.66, channels[9].on, [tempo * 0.166] )
-        t2 = Timer( tempo, channels[9].on, [tempo * 0.33] )
-        t3 = Timer( tempo * 1.33, channels[8].on, [tempo * 0.33] )
-        t4 = Timer( tempo * 1.66, channels[1].on, [tempo * 0.33] )
-        t5 = Timer( tempo * 2, channels[1].on, [tempo * 0.33] )
-        t6 = Timer( tempo * 2.33, channels[6].on, [tempo * 0.33] )
-        t7 = Timer( tempo * 2.66, channels[5].on, [tempo * 0.33] )
-        t1.start()
-        t2.start()
-        t3.start()
-        t4.start()
-        t5.start()
-        t6.start()
-        t7.start()
-    elif( phrase == 15 ):
-        # Descent, part 2
-        channels[6].on( tempo * 0.33 )
-        t1 = Timer( tempo * 0.33, channels[5].on, [tempo * 0.33] )
-        t2 = Timer( tempo, channels[2].on, [tempo * 0.33] )
-        t3 = Timer( tempo, channels[3].on, [tempo * 0.33] )
-        t4 = Timer( tempo * 1.33, channels[2].on, [tempo * 0.33] )
-        t5 = Timer( tempo * 1.33, channels[3].on, [tempo * 0.33] )
-        t6 = Timer( tempo * 1.66, channels[4].on, [tempo * 0.33] )
-        t7 = Timer( tempo * 1.66, channels[7].on, [tempo * 0.33] )
-        t8 = Timer( tempo * 2, channels[0].on, [tempo * 0.166] )
-        t9 = Timer( tempo * 2.33, channels[0].on, [tempo * 0.1] )
-        t1.start()
-        t2.start()
-        t3.start()
-        t4.start()
-        t5.start()
-        t6.start()
-        t7.start()
-        t8.start()
-        t9.start()
-        
+    global channels, scheduler
+    flashAll, notes = scalePhrase( phrase, tempo )
+    if( flashAll > 0 ):
+        allOn( flashAll )
+    for delay, channel, duration in notes:
+        if( delay == 0 ):
+            channels[channel].on( duration )
+        else:
+            scheduler.schedule( delay, channels[channel].on, [duration] )
     return True
 
 def flashOff( x, mode ):
-    global flashTimers, channels
-    r = random()
+    global flashTimers, flashRandom, flashScalers, channels, scheduler
     if mode == 0:
         flashOn( x, mode )
     else:
-        if mode == 1:
-            scaler = 5.0
-        elif mode == 2:
-            scaler =  3.0
-        else:
-            scaler = 0.5
+        r = flashRandom.random()
         channels[x].off()
-        flashTimers[x] = Timer( r * scaler, flashOn, [x, mode] )
-        flashTimers[x].start()
+        flashTimers[x] = scheduler.schedule( r * flashScalers[mode], flashOn, [x, mode] )
     return True
     
 def flashOn( x, mode ):
-    global flashTimers, channels
-    r = random()
+    global flashTimers, flashRandom, flashScalers, channels, scheduler
     channels[x].on()
     if mode != 0:
-        if mode == 1:
-            scaler = 5.0
-        elif mode == 2:
-            scaler =  3.0
-        else:
-            scaler = 0.5
-        flashTimers[x] = Timer( r * scaler, flashOff, [x, mode] )
-        flashTimers[x].start()
+        r = flashRandom.random()
+        flashTimers[x] = scheduler.schedule( r * flashScalers[mode], flashOff, [x, mode] )
     return True
        
 def flashLights( mode ):
-    global channels, flashTimers
+    global channels, flashTimers, scheduler
     for x in range( 10 ):
-        flashTimers[x].cancel()
+        if flashTimers[x] is not None:
+            scheduler.cancel( flashTimers[x] )
         if mode > -1:
             flashOff( x, mode )
     return True
@@ -492,7 +267,7 @@ def flashLights( mode ):
 def btncallback(index, state):
     global player, lightMode, started, preludeFinished, mainFinished, finished, preludeCurrentBeat, mainCurrentBeat, channels
     if state:
-        if (lightMode == 4) and (player != False):
+        if (lightMode == 4) and (player is not None):
             player.stop()
         if index == 0:
             flashLights( -1 )
@@ -514,6 +289,50 @@ def btncallback(index, state):
             lightMode = 4
             player = Player( "/home/pi/pi-lightshow/carol.mp3", endCb, syncCb )
 
+# Cues for the main song, in the order they fire within a beat
+mainCues = [
+    # Pulse all channels
+    ( [45, 141, 142, 143, 144, 145, 146, 147, 148, 157, 158, 159, 160, 165], allOn, [0.25] ),
+    # Uneven "God rest ye merry gentlemen"
+    ( [8, 16, 64, 68, 72, 76, 80, 84], playPhrase, [3, mainTempo] ),
+    # Carol of the bells, "ding, dong, ding, dong"
+    ( [9, 17, 73, 77, 81, 85, 97, 101, 105, 109], playPhrase, [4, mainTempo] ),
+    # Carol of the bells, repeating theme
+    ( [25, 26, 27, 28, 29, 30, 31, 32, 61, 62, 63, 64, 73, 105, 106, 107, 108, 109, 110, 111, 112, 121, 122, 123, 124, 125, 126, 127, 128, 166, 167, 168, 169, 170, 171, 172, 173, 174, 175], playPhrase, [5, mainTempo] ),
+    # Carol of the bells, repeating theme, dual notes
+    ( [29, 30, 31, 32], playPhrase, [6, mainTempo] ),
+    # Carol of the bells, "gaily they ring"
+    ( [33, 113, 129], playPhrase, [7, mainTempo] ),
+    # Carol of the bells, "while people sing"
+    ( [34, 114, 130], playPhrase, [8, mainTempo] ),
+    # Carol of the bells, "songs of good cheer"
+    ( [35, 115, 131], playPhrase, [9, mainTempo] ),
+    # Carol of the bells, "Christmas is here"
+    ( [36, 116, 132], playPhrase, [10, mainTempo] ),
+    # Carol of the bells, "merry, merry, merry.."
+    ( [37, 39, 41, 42, 43, 44, 117, 119, 133, 135], playPhrase, [11, mainTempo] ),
+    # Carol of the bells, "..merry Christmas"
+    ( [38, 40, 118, 120, 134, 136, 137, 138, 139, 140], playPhrase, [12, mainTempo] ),
+    # Pulsing base
+    ( [1, 2, 3, 4, 5, 6, 7, 8, 9, 13, 14, 15, 16, 21, 22, 23, 24, 89, 90, 91, 92, 93, 94, 95, 96], playPhrase, [13, mainTempo] ),
+    # Descent, part 1
+    ( [44, 48, 52, 56], playPhrase, [14, mainTempo] ),
+    # Descent, part 2
+    ( [47, 51, 55, 59], playPhrase, [15, mainTempo] ),
+    # Fast random flashing
+    ( [161], flashLights, [3] ),
+    # Turn off random flashing
+    ( [165], flashLights, [-1] ),
+    ( [149, 151, 153, 155], stepDown, [mainTempo] ),
+    ( [150, 152, 154, 156], stepUp, [mainTempo] )
+]
+
+# Build the beat -> cues lookup once so each beat is a single dict lookup
+mainSchedule = {}
+for beats, action, args in mainCues:
+    for beat in beats:
+        mainSchedule.setdefault( beat, [] ).append( ( action, args ) )
+
 powerButton = Button(0, 25, btncallback)
 modeButton = Button(1, 24, btncallback)
 lightshowButton = Button(2, 23, btncallback)
@@ -525,11 +344,15 @@ try:
         sleep( 1 )
         if lightMode != 4:
             if integrationCheck != "":
+                if integrationSession is None:
+                    # Only pay for importing requests when integration is configured
+                    import requests
+                    integrationSession = requests.Session()
                 try:
-                    r = requests.get( integrationCheck )
+                    r = integrationSession.get( integrationCheck )
                     if r.text == "1":
                         try:
-                            requests.get( integrationDone )
+                            integrationSession.get( integrationDone )
                             btncallback( 2, 1 )
                         except:
                             print( "Problem connecting to done API" )
@@ -540,6 +363,6 @@ try:
         pass
 finally:
     flashLights( -1 )
-    if lightMode == 4:
+    if (lightMode == 4) and (player is not None):
         player.stop()
     GPIO.cleanup()
@@ -1,11 +1,10 @@
 from omxplayer.player import OMXPlayer
 from pathlib import Path
-from time import sleep
-from threading import Thread
+from threading import Thread, Event
 
 class Player:
     def __init__(self, path, endCallback = None, syncCallback = None):
-        self.finished = False
+        self.finishedEvent = Event()
         self.path = Path( path )
         self.syncCallback = syncCallback
         self.endCallback = endCallback
@@ -16,10 +15,14 @@ class Player:
         self.player = OMXPlayer( self.path, args = "-o local" )
         self.player.exitEvent = self.exitEvent
         self.player.stopEvent = self.stopEvent
-        while not self.finished:
-            sleep( 0.5 )
-            if self.syncCallback and not self.finished:
-                self.syncCallback( self.player.position() )
+        # Poll for sync only until the callback is cleared, then just
+        # block until playback ends instead of waking every half second
+        while not self.finishedEvent.wait( 0.5 ):
+            syncCallback = self.syncCallback
+            if not syncCallback:
+                break
+            syncCallback( self.player.position() )
+        self.finishedEvent.wait()
         self.player.quit()
     
     def stop(self):
@@ -29,12 +32,12 @@ class Player:
         return self.player.position()
     
     def exitEvent(self, player, exit_status):
-        self.finished = True
+        self.finishedEvent.set()
         if self.endCallback:
             self.endCallback()
     
     def stopEvent(self, player):
-        self.finished = True
+        self.finishedEvent.set()
         if self.endCallback:
             self.endCallback()
 
@@ -0,0 +1,74 @@
+from threading import Thread, Condition
+from heapq import heappush, heappop
+from itertools import count
+from traceback import print_exc
+try:
+    from time import monotonic as clock
+    # Condition.wait blocks on the lock for the full timeout and wakes on notify
+    waitSlice = None
+except ImportError:
+    # Python 2: Condition.wait sleep-polls in steps of up to 50 ms, so wait in
+    # short slices to notice newly scheduled earlier events promptly
+    from time import time as clock
+    waitSlice = 0.01
+
+class Scheduler:
+    """
+    Runs delayed calls from one long-lived thread, instead of starting a
+    new threading.Timer thread for every light that needs switching later.
+    """
+    def __init__(self):
+        self.queue = []
+        self.counter = count()
+        self.condition = Condition()
+        self.thread = Thread( target = self.run )
+        self.thread.daemon = True
+        self.thread.start()
+
+    def schedule(self, delay, function, args = []):
+        # Sequence number keeps equal deadlines in the order they were added
+        event = [clock() + delay, next( self.counter ), function, args]
+        with self.condition:
+            heappush( self.queue, event )
+            if self.queue[0] is event:
+                self.condition.notify()
+        return event
+
+    def cancel(self, event):
+        # Cancelled events are skipped when they reach the front of the queue
+        event[2] = None
+
+    def run(self):
+        while True:
+            with self.condition:
+                while True:
+                    if not self.queue:
+                        self.condition.wait()
+                        continue
+                    delay = self.queue[0][0] - clock()
+                    if delay <= 0:
+                        break
+                    if waitSlice is not None and delay > waitSlice:
+                        delay = waitSlice
+                    self.condition.wait( delay )
+                event = heappop( self.queue )
+            function = event[2]
+            if function is not None:
+                try:
+                    function( *event[3] )
+                except Exception:
+                    print_exc()
+
+
+"""
+def hello( name ):
+    print( "Hello " + name )
+
+scheduler = Scheduler()
+scheduler.schedule( 2, hello, ["second"] )
+scheduler.schedule( 1, hello, ["first"] )
+cancelled = scheduler.schedule( 1.5, hello, ["never"] )
+scheduler.cancel( cancelled )
+
+input( "Press Enter to quit" )
+"""